@@ -1,6 +1,20 @@
 import json
+import mmap
 import os
 import re
+import shutil
+import tempfile
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# 已解析的 JSON 文件缓存: 文件路径 -> (修改时间, 数据)
+_json_cache = {}
+# 出现位置索引缓存: (data 文件夹, 关键词) -> [(文件名, JSON 路径, 偏移), ...]
+_index_cache = {}
+
+# 写回日志，崩溃后用于回滚（不以 .json 结尾，避免被当作数据文件）
+JOURNAL_FILE = ".name_modifier_journal"
 
 def read_json_file(file_path):
     try:
@@ -15,6 +29,145 @@ def write_json_file(file_path, data):
     with open(file_path, "w", encoding="utf-8") as file:
         json.dump(data, file, ensure_ascii=False, indent=2)
 
+def write_temp_json_file(file_path, data):
+    fd, temp_path = tempfile.mkstemp(
+        prefix=os.path.basename(file_path) + ".",
+        suffix=".tmp",
+        dir=os.path.dirname(file_path) or ".",
+    )
+    try:
+        # indent 会让 json 使用纯 Python 编码器，序列化受 GIL 限制，
+        # 线程池只能让磁盘写入相互重叠
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+        # mkstemp 创建的文件权限为 0600，保持与原文件一致
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+    except Exception:
+        remove_if_exists(temp_path)
+        raise
+    return temp_path
+
+def fsync_path(path):
+    with open(path, "r+b") as file:
+        os.fsync(file.fileno())
+
+def fsync_directory(directory):
+    # Windows 不支持对目录 fsync
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def write_journal(journal_path, state, entries):
+    # 先写临时文件再原子替换，崩溃时日志要么是旧版本要么是新版本
+    directory = os.path.dirname(journal_path) or "."
+    fd, temp_path = tempfile.mkstemp(
+        prefix=os.path.basename(journal_path) + ".", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump({"state": state, "entries": entries}, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, journal_path)
+    except Exception:
+        remove_if_exists(temp_path)
+        raise
+    fsync_directory(directory)
+
+def remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def unique_backup_path(file_path):
+    # 随机文件名，不会与用户已有的 .bak 文件冲突
+    return f"{file_path}.{uuid.uuid4().hex}.bak"
+
+def backup_file(file_path, backup_path):
+    try:
+        os.link(file_path, backup_path)
+    except FileExistsError:
+        raise
+    except OSError:
+        # 不支持硬链接的文件系统退回到复制，"xb" 保证不覆盖已有文件
+        with open(file_path, "rb") as source, open(backup_path, "xb") as target:
+            shutil.copyfileobj(source, target)
+            target.flush()
+            os.fsync(target.fileno())
+        shutil.copystat(file_path, backup_path)
+
+def recover_from_journal(input_path):
+    # 日志状态:
+    #   prepared  临时文件已写好，原文件未改动，只需清理
+    #   backed_up 本次创建的备份已全部落盘，替换可能已开始，需要用备份恢复
+    #   committed 替换已完成，只需清理备份
+    journal_path = os.path.join(input_path, JOURNAL_FILE)
+    if not os.path.exists(journal_path):
+        return False
+    with open(journal_path, "r", encoding="utf-8") as file:
+        journal = json.load(file)
+    restore = journal["state"] == "backed_up"
+    for entry in journal["entries"]:
+        # 恢复过程本身中断时再次运行，已恢复的备份不再存在
+        if restore and os.path.exists(entry["backup"]):
+            os.replace(entry["backup"], entry["target"])
+        # 目标未被替换时备份与其是同一文件的硬链接，rename 不会删除备份
+        remove_if_exists(entry["backup"])
+        remove_if_exists(entry["temp"])
+    fsync_directory(input_path)
+    os.remove(journal_path)
+    fsync_directory(input_path)
+    return restore
+
+def commit_json_files(input_path, files, max_workers=None):
+    # 并行写入临时文件并批量 fsync，再原子替换；任何一步失败都整体回滚
+    targets = [os.path.join(input_path, file) for file, _ in files]
+    journal_path = os.path.join(input_path, JOURNAL_FILE)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(write_temp_json_file, target, data)
+            for target, (_, data) in zip(targets, files)
+        ]
+        temp_paths = [future.result() for future in futures if not future.exception()]
+        try:
+            if len(temp_paths) < len(futures):
+                raise next(f.exception() for f in futures if f.exception())
+            list(executor.map(fsync_path, temp_paths))
+            entries = [
+                {
+                    "target": target,
+                    "temp": temp_path,
+                    "backup": unique_backup_path(target),
+                }
+                for target, temp_path in zip(targets, temp_paths)
+            ]
+            write_journal(journal_path, "prepared", entries)
+        except Exception:
+            for temp_path in temp_paths:
+                remove_if_exists(temp_path)
+            raise
+
+    try:
+        for entry in entries:
+            backup_file(entry["target"], entry["backup"])
+        fsync_directory(input_path)
+        write_journal(journal_path, "backed_up", entries)
+        for entry in entries:
+            os.replace(entry["temp"], entry["target"])
+        fsync_directory(input_path)
+        write_journal(journal_path, "committed", entries)
+    except Exception:
+        recover_from_journal(input_path)
+        raise
+    # 已提交，清理备份和日志
+    recover_from_journal(input_path)
+
 def count_occurrences_in_object(obj, name):
     count = 0
     if isinstance(obj, dict):
@@ -53,8 +206,174 @@ def find_and_replace_in_object(obj, old_name, new_name):
                 count += find_and_replace_in_object(item, old_name, new_name)
     return count
 
+def load_cached_json(file_path):
+    mtime = os.path.getmtime(file_path)
+    cached = _json_cache.get(file_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    data = read_json_file(file_path)
+    _json_cache[file_path] = (mtime, data)
+    return data
+
+def list_json_files(input_path):
+    return sorted(
+        file for file in os.listdir(input_path) if file.lower().endswith(".json")
+    )
+
+def iter_string_values(obj, path=()):
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in items:
+        if isinstance(value, str):
+            yield path + (key,), value
+        elif isinstance(value, (dict, list)):
+            yield from iter_string_values(value, path + (key,))
+
+def find_offsets(text, term):
+    # 与 re.findall 一致的非重叠匹配
+    offsets = []
+    start = text.find(term)
+    while start != -1:
+        offsets.append(start)
+        start = text.find(term, start + len(term))
+    return offsets
+
+def get_value_at_path(obj, json_path):
+    for key in json_path:
+        obj = obj[key]
+    return obj
+
+def format_json_path(file, json_path):
+    return "/".join([file] + [str(key) for key in json_path])
+
+def build_prefilter(terms):
+    # 关键词在 JSON 文本中可能的字节形式: UTF-8 原文，以及 \uXXXX 转义形式
+    needles = set()
+    escape_units = set()
+    for term in terms:
+        needles.add(term.encode("utf-8"))
+        needles.add(json.dumps(term, ensure_ascii=False)[1:-1].encode("utf-8"))
+        escaped = json.dumps(term)[1:-1]
+        needles.add(escaped.encode("ascii"))
+        needles.add(
+            re.sub(
+                r"\\u([0-9a-f]{4})", lambda m: "\\u" + m.group(1).upper(), escaped
+            ).encode("ascii")
+        )
+        # 超出 BMP 的字符以代理对转义，记录每个 UTF-16 单元
+        units = term.encode("utf-16-be")
+        for i in range(0, len(units), 2):
+            escape_units.add(int.from_bytes(units[i:i + 2], "big"))
+    has_slash = any("/" in term for term in terms)
+    # 合并为一个正则，整个文件只扫描一遍
+    pattern = re.compile(b"|".join(map(re.escape, sorted(needles))))
+    return pattern, escape_units, has_slash
+
+def file_may_contain(file_path, pattern, escape_units, has_slash):
+    if os.path.getsize(file_path) == 0:
+        return False
+    with open(file_path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        if pattern.search(data):
+            return True
+        # 关键词中只有部分字符被转义时，逐个检查转义字符
+        if has_slash and data.find(b"\\/") != -1:
+            return True
+        if data.find(b"\\u") != -1:
+            for match in re.finditer(rb"\\u([0-9a-fA-F]{4})", data):
+                if int(match.group(1), 16) in escape_units:
+                    return True
+    return False
+
+def build_occurrence_index(input_path, terms):
+    # 一次扫描 data 文件夹，建立 关键词 -> [(文件名, JSON 路径, 偏移)] 的索引
+    # 同名角色可能出现多次，去重以免位置被重复记录
+    missing = list(
+        dict.fromkeys(
+            term for term in terms if term and (input_path, term) not in _index_cache
+        )
+    )
+    if missing:
+        index = {term: [] for term in missing}
+        pattern, escape_units, has_slash = build_prefilter(missing)
+        skipped_files = 0
+        skipped_bytes = 0
+        for file in list_json_files(input_path):
+            file_path = os.path.join(input_path, file)
+            try:
+                # 按字节预筛选，不可能包含关键词的文件无需解析
+                if file_path not in _json_cache and not file_may_contain(
+                    file_path, pattern, escape_units, has_slash
+                ):
+                    skipped_files += 1
+                    skipped_bytes += os.path.getsize(file_path)
+                    continue
+                json_data = load_cached_json(file_path)
+            except Exception as e:
+                print(f"处理文件 {file} 时出错: {str(e)}")
+                continue
+            for json_path, value in iter_string_values(json_data):
+                for term in missing:
+                    for offset in find_offsets(value, term):
+                        index[term].append((file, json_path, offset))
+        if skipped_files:
+            print(
+                f"预筛选跳过了 {skipped_files} 个文件"
+                f"（{skipped_bytes / 1024 / 1024:.1f} MB），无需解析"
+            )
+        for term in missing:
+            _index_cache[(input_path, term)] = index[term]
+    return {term: _index_cache.get((input_path, term), []) for term in terms}
+
+def invalidate_occurrence_index(input_path):
+    for key in [key for key in _index_cache if key[0] == input_path]:
+        del _index_cache[key]
+
+def preview_replacement(input_path, locations, old_name, new_name, context=15, limit=50):
+    for file, json_path, offset in locations[:limit]:
+        json_data = load_cached_json(os.path.join(input_path, file))
+        value = get_value_at_path(json_data, json_path)
+        before = value[max(0, offset - context):offset]
+        after = value[offset + len(old_name):offset + len(old_name) + context]
+        snippet = f"{before}[{old_name} -> {new_name}]{after}".replace("\n", "\\n")
+        print(f"  {format_json_path(file, json_path)} @{offset}: {snippet}")
+    if len(locations) > limit:
+        print(f"  ... 其余 {len(locations) - limit} 处未显示")
+
+def replace_indexed_occurrences(input_path, locations, old_name, new_name):
+    # 只修改索引中记录的文件和路径，不再重新遍历所有文件
+    paths_by_file = defaultdict(set)
+    for file, json_path, _ in locations:
+        paths_by_file[file].add(json_path)
+
+    modified_files = []
+    for file in sorted(paths_by_file):
+        file_path = os.path.join(input_path, file)
+        json_data = load_cached_json(file_path)
+        replacements = 0
+        for json_path in paths_by_file[file]:
+            parent = get_value_at_path(json_data, json_path[:-1])
+            value = parent[json_path[-1]]
+            replacements += value.count(old_name)
+            parent[json_path[-1]] = value.replace(old_name, new_name)
+        if replacements > 0:
+            modified_files.append((file, json_data, replacements))
+    return modified_files
+
 def main():
     input_path = input("请输入游戏data文件夹的路径（拖动进来即可）: ").strip('"')  # 去引号
+    try:
+        if recover_from_journal(input_path):
+            print("检测到上次替换未完成，已恢复原文件。")
+    except Exception as e:
+        print(f"无法根据日志 {JOURNAL_FILE} 恢复上次的替换: {str(e)}")
+        print("请检查 data 文件夹中的 .bak 与 .tmp 文件，处理完后删除该日志再运行。")
+        return
     actors_file = os.path.join(input_path, "Actors.json")
     actors_data = read_json_file(actors_file)
 
@@ -65,17 +384,10 @@ def main():
         if actor and actor.get("name") and actor["name"].strip()
     ]
 
-    character_counts = {name: 0 for name in character_names}
-
-    for file in os.listdir(input_path):
-        if file.lower().endswith(".json"):
-            file_path = os.path.join(input_path, file)
-            try:
-                json_data = read_json_file(file_path)
-                for name in character_names:
-                    character_counts[name] += count_occurrences_in_object(json_data, name)
-            except Exception as e:
-                print(f"处理文件 {file} 时出错: {str(e)}")
+    occurrence_index = build_occurrence_index(input_path, character_names)
+    character_counts = {
+        name: len(occurrence_index[name]) for name in character_names
+    }
 
     sorted_characters = sorted(
         character_counts.items(), key=lambda x: x[1], reverse=True
@@ -98,25 +410,45 @@ def main():
         print("无效的选择。")
         return
 
+    if not old_name:
+        print("替换内容不能为空。")
+        return
+
+    locations = build_occurrence_index(input_path, [old_name])[old_name]
+    if not locations:
+        print(f"未找到 {old_name}。")
+        return
+
+    print(f"共找到 {len(locations)} 处 {old_name}。")
+    if input("是否预览替换内容？(是(y)/否): ").lower().strip() in ["是", "y", "yes"]:
+        preview_replacement(input_path, locations, old_name, new_name)
+        if input("确认替换？(是(y)/否): ").lower().strip() not in ["是", "y", "yes"]:
+            print("已取消替换。")
+            return
+
     total_replacements = 0
     files_modified = 0
 
-    # 遍历data文件夹中的所有JSON文件
-    for file in os.listdir(input_path):
-        if file.lower().endswith(".json"):
-            file_path = os.path.join(input_path, file)
-            try:
-                json_data = read_json_file(file_path)
-                replacements = find_and_replace_in_object(
-                    json_data, old_name, new_name
-                )
-                if replacements > 0:
-                    write_json_file(file_path, json_data)
-                    print(f"{file}: 替换了 {replacements} 处")
-                    total_replacements += replacements
-                    files_modified += 1
-            except Exception as e:
-                print(f"处理文件 {file} 时出错: {str(e)}")
+    # 只处理索引中包含该内容的文件，全部写入成功或全部回滚
+    modified_files = replace_indexed_occurrences(
+        input_path, locations, old_name, new_name
+    )
+    try:
+        commit_json_files(
+            input_path, [(file, json_data) for file, json_data, _ in modified_files]
+        )
+        for file, _, replacements in modified_files:
+            print(f"{file}: 替换了 {replacements} 处")
+            total_replacements += replacements
+            files_modified += 1
+    except Exception as e:
+        print(f"写入文件时出错，已回滚所有修改: {str(e)}")
+        print("替换失败，未修改任何文件。")
+        return
+    finally:
+        for file, _, _ in modified_files:
+            _json_cache.pop(os.path.join(input_path, file), None)
+        invalidate_occurrence_index(input_path)
 
     print("替换完成!")
     print(f"总共修改了 {files_modified} 个文件")
@@ -0,0 +1,172 @@
+import math
+import os
+
+import numpy as np
+
+from rmmv_event_extractor import (
+    extract_all_info,
+    find_data_directory,
+    validate_data_directory,
+)
+
+# 长词的出现次数达到短词的该比例时，短词视为长词的一部分而不单独输出
+SUBSUME_RATIO = 0.9
+# 多项式哈希的基数，仅在 n-gram 无法无损压入 64 位时使用
+HASH_BASE = np.uint64(0x100000001B3)
+
+
+def build_corpus(all_info):
+    # 对话与选项按地图/公共事件分组，每组作为一个文档统计分布
+    lines = []
+    doc_ids = []
+    doc_names = []
+    for doc_id, (map_id, map_data) in enumerate(all_info.items()):
+        doc_names.append(map_data["name"] or str(map_id))
+        for _, event_info in map_data["events"]:
+            texts = [text for _, text in event_info["dialogue"]]
+            texts.extend(event_info["choices"])
+            for text in texts:
+                lines.append(text)
+                doc_ids.append(doc_id)
+    return lines, doc_ids, doc_names
+
+
+def encode_corpus(lines, doc_ids):
+    # 按字符编码为连续的整数 ID，非文字字符（标点、空白、换行）记为 0 作为分隔
+    text = "\n".join(lines) + "\n"
+    # json.load 可能产生孤立代理字符，原样保留一个码位，之后与标点一样作为分隔
+    codes = np.frombuffer(
+        text.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32
+    )
+    lengths = np.fromiter((len(line) + 1 for line in lines), np.int64, len(lines))
+    docs = np.repeat(np.asarray(doc_ids, dtype=np.int32), lengths)
+
+    vocab, inverse = np.unique(codes, return_inverse=True)
+    is_word = np.fromiter((chr(code).isalnum() for code in vocab), bool, len(vocab))
+    ids = inverse.astype(np.uint64) + np.uint64(1)
+    ids[~is_word[inverse]] = 0
+    return text, ids, docs, int(len(vocab)).bit_length()
+
+
+def count_ngrams(ids, docs, n, bits, min_count):
+    window_count = len(ids) - n + 1
+    if window_count <= 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+
+    # 每个窗口压成一个 uint64 键，放不下时退回多项式哈希
+    keys = np.zeros(window_count, dtype=np.uint64)
+    exact = n * bits <= 64
+    for k in range(n):
+        window = ids[k:k + window_count]
+        if exact:
+            keys = (keys << np.uint64(bits)) | window
+        else:
+            keys = keys * HASH_BASE + window
+
+    separators = np.concatenate(([0], np.cumsum(ids == 0)))
+    positions = np.nonzero(separators[n:] == separators[:window_count])[0]
+    if len(positions) == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+    keys = keys[positions]
+    position_docs = docs[positions]
+
+    order = np.lexsort((position_docs, keys))
+    keys = keys[order]
+    positions = positions[order]
+    position_docs = position_docs[order]
+
+    key_start = np.concatenate(([True], keys[1:] != keys[:-1]))
+    doc_start = key_start | np.concatenate(
+        ([True], position_docs[1:] != position_docs[:-1])
+    )
+    starts = np.nonzero(key_start)[0]
+    counts = np.diff(np.append(starts, len(keys)))
+    spreads = np.add.reduceat(doc_start.astype(np.int64), starts)
+
+    keep = counts >= min_count
+    return positions[starts][keep], counts[keep], spreads[keep]
+
+
+def collect_candidate_terms(all_info, min_length=2, max_length=8, min_count=5):
+    lines, doc_ids, doc_names = build_corpus(all_info)
+    if not lines:
+        return [], doc_names
+    text, ids, docs, bits = encode_corpus(lines, doc_ids)
+
+    stats = {}
+    for n in range(min_length, max_length + 1):
+        positions, counts, spreads = count_ngrams(ids, docs, n, bits, min_count)
+        if len(positions) == 0:
+            break
+        for position, count, spread in zip(
+            positions.tolist(), counts.tolist(), spreads.tolist()
+        ):
+            stats[text[position:position + n]] = (count, spread)
+
+    # 去掉几乎总是作为更长词一部分出现的片段，如 "艾丽丝" 中的 "艾丽"
+    subsumed = set()
+    for term, (count, _) in stats.items():
+        if len(term) > min_length:
+            for part in (term[:-1], term[1:]):
+                if part in stats and count >= SUBSUME_RATIO * stats[part][0]:
+                    subsumed.add(part)
+
+    candidates = [
+        (term, count, spread, count * math.log2(1 + spread))
+        for term, (count, spread) in stats.items()
+        if term not in subsumed
+    ]
+    candidates.sort(key=lambda x: (x[3], len(x[0])), reverse=True)
+    return candidates, doc_names
+
+
+def write_glossary_draft(output_file, candidates):
+    with open(output_file, "w", encoding="utf-8") as file:
+        file.write("术语\t译文\t出现次数\t地图数\n")
+        for term, count, spread, _ in candidates:
+            file.write(f"{term}\t\t{count}\t{spread}\n")
+
+
+def main():
+    try:
+        while True:
+            directory = input("请输入游戏目录的路径: ").strip().strip('"')
+            directory = os.path.normpath(directory)
+
+            data_dir = find_data_directory(directory)
+            if data_dir:
+                print(f"找到有效的数据目录: {data_dir}")
+                directory = data_dir
+                break
+            else:
+                missing_files = validate_data_directory(directory)
+                if missing_files:
+                    print(f"在指定目录中缺少以下文件: {', '.join(missing_files)}")
+                else:
+                    print("无法找到有效的数据目录。")
+                print("请确保您输入的是游戏的主目录，或者直接指向 'data' 文件夹。")
+
+        output_file = input("请输入输出文件名（默认为 glossary_draft.txt）: ").strip()
+        if not output_file:
+            output_file = "glossary_draft.txt"
+        min_count = int(input("最少出现次数（默认为 5）: ").strip() or 5)
+        max_length = int(input("术语最大长度（默认为 8）: ").strip() or 8)
+
+        all_info = extract_all_info(directory)
+        candidates, doc_names = collect_candidate_terms(
+            all_info, max_length=max_length, min_count=min_count
+        )
+        write_glossary_draft(output_file, candidates)
+
+        print(f"在 {len(doc_names)} 个地图/公共事件中找到 {len(candidates)} 个候选术语:")
+        for index, (term, count, spread, _) in enumerate(candidates[:30], 1):
+            print(f"{index}. {term} (出现 {count} 次，分布于 {spread} 个地图)")
+        print(f"术语表草稿已保存到 {output_file}")
+
+    except Exception as e:
+        print(f"处理过程中出错: {e}")
+        print("请确保您有权限访问该路径下的文件，或是否为明文 JSON 格式。")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import mmap
 import re
 import os
+import shutil
+import tempfile
+
+# 超过该大小的文件使用流式模式，内存占用与文件大小无关
+STREAMING_THRESHOLD = 64 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024
 
 def replace_json_content(file_path, old_value, new_value):
     try:
@@ -35,6 +42,74 @@ def replace_json_content(file_path, old_value, new_value):
         print(f"发生未预期的错误：{e}")
         return 0
 
+def find_safe_cut(buffer):
+    # 找到最后一个不是 ': "' 开头引号的 '"'，在其后切分不会截断任何匹配
+    end = len(buffer)
+    while True:
+        quote = buffer.rfind(b'"', 2, end)
+        if quote == -1:
+            return 0
+        if buffer[quote - 2:quote] != b": ":
+            return quote + 1
+        end = quote
+
+
+def replace_json_content_streaming(file_path, old_value, new_value, chunk_size=CHUNK_SIZE):
+    try:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件 '{file_path}' 不存在")
+
+        # UTF-8 中 '"' 不会出现在多字节字符内，可直接按字节匹配
+        old_bytes = old_value.encode("utf-8")
+        new_bytes = new_value.encode("utf-8")
+        pattern = re.compile(b': "([^"]*' + re.escape(old_bytes) + b'[^"]*)"')
+
+        def replacer(match):
+            return b': "' + match.group(1).replace(old_bytes, new_bytes) + b'"'
+
+        if os.path.getsize(file_path) == 0:
+            return 0
+
+        count = 0
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as output, open(file_path, "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                    carry = b""
+                    for start in range(0, len(source), chunk_size):
+                        # 跨块的字符串留到下一块一起处理
+                        buffer = carry + source[start:start + chunk_size]
+                        cut = find_safe_cut(buffer)
+                        updated, replacements = pattern.subn(replacer, buffer[:cut])
+                        output.write(updated)
+                        count += replacements
+                        carry = buffer[cut:]
+                    updated, replacements = pattern.subn(replacer, carry)
+                    output.write(updated)
+                    count += replacements
+                output.flush()
+                os.fsync(output.fileno())
+
+            if count > 0:
+                shutil.copymode(file_path, temp_path)
+                os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return count
+
+    except FileNotFoundError as e:
+        print(f"错误：{e}")
+        return 0
+    except PermissionError:
+        print(f"错误：没有权限访问文件 '{file_path}'")
+        return 0
+    except Exception as e:
+        print(f"发生未预期的错误：{e}")
+        return 0
+
 # 主程序
 if __name__ == "__main__":
     file_path = input("请输入JSON文件的路径：")
@@ -46,7 +121,15 @@ if __name__ == "__main__":
 
         new_value = input("请输入新的内容：")
 
-        total_replacements = replace_json_content(file_path, old_value, new_value)
+        if (
+            os.path.isfile(file_path)
+            and os.path.getsize(file_path) > STREAMING_THRESHOLD
+        ):
+            total_replacements = replace_json_content_streaming(
+                file_path, old_value, new_value
+            )
+        else:
+            total_replacements = replace_json_content(file_path, old_value, new_value)
 
         if total_replacements > 0:
             print(f"替换完成。总共进行了 {total_replacements} 处替换。")
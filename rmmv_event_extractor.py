@@ -27,8 +27,10 @@ def load_actor_names(directory):
     return actor_names
 
 
-def load_map_names(directory):
+def load_map_infos(directory):
+    # 一次读取 MapInfos.json，返回地图名称与父地图 ID
     map_names = {}
+    map_parents = {}
     map_infos_file = os.path.join(directory, "MapInfos.json")
     try:
         with open(map_infos_file, "r", encoding="utf-8-sig") as file:
@@ -39,14 +41,29 @@ def load_map_names(directory):
                         map_names[map_info["id"]] = map_info.get(
                             "name", f"地图 {map_info['id']}"
                         )
+                        map_parents[map_info["id"]] = map_info.get("parentId", 0)
             elif isinstance(map_infos, dict):
                 for map_id, map_info in map_infos.items():
                     if map_info:
                         map_names[int(map_id)] = map_info.get("name", f"地图 {map_id}")
+                        map_parents[int(map_id)] = map_info.get("parentId", 0)
         logging.info(f"成功加载 {len(map_names)} 个地图名称")
     except Exception as e:
         logging.error(f"加载地图名称时出错: {e}")
-    return map_names
+    return map_names, map_parents
+
+
+def load_map_names(directory):
+    return load_map_infos(directory)[0]
+
+
+def list_map_files(directory):
+    map_files = {}
+    for filename in os.listdir(directory):
+        match = re.fullmatch(r"Map(\d+)\.json", filename)
+        if match:
+            map_files[int(match.group(1))] = filename
+    return map_files
 
 
 def load_item_names(directory):
@@ -195,53 +212,134 @@ def extract_map_info(
     return events
 
 
-def extract_all_info(directory):
+def parse_id_ranges(text):
+    # "1-5, 8" -> {1, 2, 3, 4, 5, 8}
+    ids = set()
+    for part in re.split(r"[,，\s]+", text.strip()):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ids.update(range(int(start), int(end) + 1))
+        else:
+            ids.add(int(part))
+    return ids
+
+
+def collect_map_subtree(map_parents, root_ids):
+    children = defaultdict(list)
+    for map_id, parent_id in map_parents.items():
+        children[parent_id].append(map_id)
+
+    subtree = set()
+    pending = list(root_ids)
+    while pending:
+        map_id = pending.pop()
+        if map_id not in subtree:
+            subtree.add(map_id)
+            pending.extend(children[map_id])
+    return subtree
+
+
+def is_flashback_map(map_name):
+    return "回想" in map_name.lower()
+
+
+def select_map_ids(
+    directory,
+    map_names,
+    map_parents,
+    root_ids=None,
+    id_ranges=None,
+    name_pattern=None,
+    exclude_flashback=False,
+):
+    # 只根据 MapInfos.json 和文件名筛选，不读取地图文件本身
+    selected = set(list_map_files(directory))
+    if root_ids:
+        selected &= collect_map_subtree(map_parents, root_ids)
+    if id_ranges:
+        selected &= id_ranges
+    if name_pattern:
+        selected = {
+            map_id
+            for map_id in selected
+            if re.search(name_pattern, map_names.get(map_id, ""))
+        }
+    if exclude_flashback:
+        selected = {
+            map_id
+            for map_id in selected
+            if not is_flashback_map(map_names.get(map_id, ""))
+        }
+    return selected
+
+
+def is_common_event_selected(event, selection):
+    if not selection["include_common_events"]:
+        return False
+    event_ids = selection.get("common_event_ids")
+    if event_ids and event.get("id", 0) not in event_ids:
+        return False
+    pattern = selection.get("common_event_pattern")
+    if pattern and not re.search(pattern, event.get("name", "")):
+        return False
+    return True
+
+
+def extract_all_info(directory, selection=None, map_names=None):
+    # selection 为 None 时提取全部地图和公共事件
     all_info = {}
     actor_names = load_actor_names(directory)
-    map_names = load_map_names(directory)
+    if map_names is None:
+        map_names = load_map_names(directory)
     item_names = load_item_names(directory)
     variable_names = load_variable_names(directory)
     switch_names = load_switch_names(directory)
 
+    if selection is None:
+        selection = {"map_ids": None, "include_common_events": True}
+    map_files = list_map_files(directory)
+    if selection["map_ids"] is not None:
+        map_files = {
+            map_id: filename
+            for map_id, filename in map_files.items()
+            if map_id in selection["map_ids"]
+        }
+
     # 地图事件
-    for filename in os.listdir(directory):
-        if (
-            filename.startswith("Map")
-            and filename.endswith(".json")
-            and filename != "MapInfos.json"
-        ):
-            try:
-                map_id = int(re.search(r"Map(\d+)\.json", filename).group(1))
-                file_path = os.path.join(directory, filename)
-                with open(file_path, "r", encoding="utf-8-sig") as file:
-                    json_data = json.load(file)
-                    if isinstance(json_data, list) and len(json_data) > 0:
-                        json_data = json_data[0]
-                    map_info = extract_map_info(
-                        json_data,
-                        actor_names,
-                        map_names,
-                        switch_names,
-                        variable_names,
-                        item_names,
-                    )
-                    if map_info:
-                        all_info[map_id] = {
-                            "name": map_names.get(map_id, f"地图 {map_id}"),
-                            "events": map_info,
-                        }
-                        logging.info(f"成功提取地图 {map_id} 的信息")
-            except Exception as e:
-                logging.error(f"处理 {filename} 时出错: {e}")
+    for map_id, filename in sorted(map_files.items()):
+        try:
+            file_path = os.path.join(directory, filename)
+            with open(file_path, "r", encoding="utf-8-sig") as file:
+                json_data = json.load(file)
+                if isinstance(json_data, list) and len(json_data) > 0:
+                    json_data = json_data[0]
+                map_info = extract_map_info(
+                    json_data,
+                    actor_names,
+                    map_names,
+                    switch_names,
+                    variable_names,
+                    item_names,
+                )
+                if map_info:
+                    all_info[map_id] = {
+                        "name": map_names.get(map_id, f"地图 {map_id}"),
+                        "events": map_info,
+                    }
+                    logging.info(f"成功提取地图 {map_id} 的信息")
+        except Exception as e:
+            logging.error(f"处理 {filename} 时出错: {e}")
 
     # 公共事件
     common_events_file = os.path.join(directory, "CommonEvents.json")
-    if os.path.exists(common_events_file):
+    if selection["include_common_events"] and os.path.exists(common_events_file):
         try:
             with open(common_events_file, "r", encoding="utf-8-sig") as file:
                 common_events_data = json.load(file)
                 for event in common_events_data:
-                    if event:
+                    if event and is_common_event_selected(event, selection):
                         event_info = extract_event_info(
                             event,
                             actor_names,
@@ -333,7 +431,7 @@ def filter_flashback_events(sorted_events, map_names):
         else:
             map_name = str(map_id)
         return (
-            "回想" in map_name.lower()
+            is_flashback_map(map_name)
             if map_name
             else False or "回想" in event_name.lower()
         )
@@ -345,6 +443,68 @@ def filter_flashback_events(sorted_events, map_names):
     ]
 
 
+def input_id_ranges(prompt):
+    while True:
+        try:
+            return parse_id_ranges(input(prompt))
+        except ValueError:
+            print("格式错误，请输入如 1-10,15 的 ID 或 ID 范围。")
+
+
+def input_pattern(prompt):
+    while True:
+        pattern = input(prompt).strip()
+        try:
+            re.compile(pattern)
+            return pattern
+        except re.error as e:
+            print(f"正则表达式无效: {e}")
+
+
+def get_selection(directory, map_names, map_parents, exclude_flashback):
+    selection = {"map_ids": None, "include_common_events": True}
+
+    partial = input("是否只提取部分地图或公共事件？(是(y)/否): ").lower().strip() in [
+        "是",
+        "y",
+        "yes",
+    ]
+    if not partial:
+        if exclude_flashback:
+            selection["map_ids"] = select_map_ids(
+                directory, map_names, map_parents, exclude_flashback=True
+            )
+        return selection
+
+    print("\n地图筛选（多个条件同时生效，留空跳过）:")
+    root_ids = input_id_ranges("根地图 ID，提取该地图及其所有子地图（如 3,12）: ")
+    id_ranges = input_id_ranges("地图 ID 范围（如 1-10,15）: ")
+    name_pattern = input_pattern("地图名称关键字或正则: ")
+    selection["map_ids"] = select_map_ids(
+        directory,
+        map_names,
+        map_parents,
+        root_ids=root_ids,
+        id_ranges=id_ranges,
+        name_pattern=name_pattern,
+        exclude_flashback=exclude_flashback,
+    )
+    print(f"已选择 {len(selection['map_ids'])} 个地图")
+
+    selection["include_common_events"] = input(
+        "是否提取公共事件？(是(y)/否): "
+    ).lower().strip() in ["是", "y", "yes"]
+    if selection["include_common_events"]:
+        selection["common_event_ids"] = input_id_ranges(
+            "公共事件 ID 范围（留空为全部）: "
+        )
+        selection["common_event_pattern"] = input_pattern(
+            "公共事件名称关键字或正则（留空为全部）: "
+        )
+
+    return selection
+
+
 def get_user_preferences():
     print("\n高级配置:")
     output_trigger = input("是否输出触发条件？(是/否): ").lower().strip() in [
@@ -469,21 +629,25 @@ def main():
         if not output_file:
             output_file = "comprehensive_story.txt"
 
-        all_info = extract_all_info(directory)
-        sorted_events = sort_events(all_info)
-
         filter_flashbacks = input(
             "是否要过滤掉回想相关的事件和地图？(是(y)/否): "
         ).lower().strip() in ["是", "y", "yes"]
 
+        # 在读取地图文件之前完成筛选，只解析选中的文件
+        map_names, map_parents = load_map_infos(directory)
+        selection = get_selection(directory, map_names, map_parents, filter_flashbacks)
+        all_info = extract_all_info(directory, selection, map_names)
+        sorted_events = sort_events(all_info)
+
         if filter_flashbacks:
-            map_names = {}
+            # 回想地图已在读取前排除，这里再按事件名过滤未命名地图中的回想事件
+            flashback_names = {}
             for map_id, data in all_info.items():
                 if isinstance(map_id, (int, str)):
-                    map_names[map_id] = data["name"]
+                    flashback_names[map_id] = data["name"]
                 else:
                     logging.warning(f"Unexpected map_id type: {type(map_id)}")
-            sorted_events = filter_flashback_events(sorted_events, map_names)
+            sorted_events = filter_flashback_events(sorted_events, flashback_names)
 
         advanced_config = input("是否进行高级配置？(是(y)/否): ").lower().strip() in [
             "是",